@@ -1,3 +1,39 @@
-from django.test import TestCase
+import random
+
+from django.test import SimpleTestCase, TestCase
+
+from .utils import _score_lsh_candidates
 
 # Create your tests here.
+
+class LSHCandidateTests(SimpleTestCase):
+    """The MinHash LSH path must not drop near-duplicate sentences."""
+
+    def test_planted_near_duplicates_survive(self):
+        rng = random.Random(42)
+        vocabulary = [
+            ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9)))
+            for _ in range(2000)
+        ]
+
+        def sentence():
+            return ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(12, 25)))
+
+        units1 = [sentence() for _ in range(300)]
+        units2 = [sentence() for _ in range(300)]
+
+        # Copy every third sentence of document 1 into document 2 with a
+        # quarter of its words replaced
+        planted = set()
+        for j in range(0, len(units2), 3):
+            i = rng.randrange(len(units1))
+            words = units1[i].split()
+            for k in rng.sample(range(len(words)), len(words) // 4):
+                words[k] = rng.choice(vocabulary)
+            units2[j] = ' '.join(words)
+            planted.add((i, j))
+
+        idx1, idx2, _ = _score_lsh_candidates(units1, units2, 0.65)
+        found = set(zip(idx1.tolist(), idx2.tolist()))
+
+        self.assertEqual(planted - found, set())
@@ -1,13 +1,14 @@
 import os
 import re
 import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import datetime
-import nltk
-from nltk.tokenize import sent_tokenize
-from difflib import SequenceMatcher
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import textract
+from dataclasses import dataclass, field
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from rapidfuzz import fuzz, process
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
@@ -21,12 +22,6 @@ from reportlab.graphics.shapes import Drawing, Line, Rect
 from reportlab.graphics.charts.piecharts import Pie
 from reportlab.lib.units import inch, cm
 
-# Download necessary NLTK data (run once)
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
 def create_segment_paragraphs(text, bgcolor, color=None):
     """
     Creates paragraphs from text segments with appropriate styling for highlighting.
@@ -111,15 +106,57 @@ class GradientBox(Flowable):
         self.canv.setFillColor(self.color2)
         self.canv.roundRect(0, 0, self.width, self.height*0.7, self.radius, stroke=0, fill=1)
 
+# Pre-compiled patterns used by the text cleaning helpers
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_NEWLINES_RE = re.compile(r'\n+')
+_TAB_TRANS = str.maketrans('\t', ' ')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.\,\!\?\;\:\"\'\/\(\)\[\]\{\}\-\_\+\=\<\>\@\#\$\%\&\*]')
+_SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_SENT_END_RE = re.compile(r'[.!?]')
+_WORD_RE = re.compile(r'\S+')
+
+# (text colour, highlight background, chart colour) for the 0-24, 25-49,
+# 50-74 and 75-100% similarity buckets
+_SIMILARITY_COLORS = [
+    (colors.darkgreen, "#D6FFD6", colors.green),       # Green
+    (colors.darkgoldenrod, "#FFF4CC", colors.yellow),  # Yellow
+    (colors.darkorange, "#FFE8CC", colors.orange),     # Orange
+    (colors.darkred, "#FFD6D6", colors.red),           # Red
+]
+# Bucket for every whole similarity percentage, indexed by int(similarity)
+_SIMILARITY_BUCKETS = [0] * 25 + [1] * 25 + [2] * 25 + [3] * 26
+
+# Below this many candidate pairs, process start-up costs more than it saves
+_PARALLEL_MIN_CANDIDATES = 20000
+# Upper bound on scoring processes started by a single comparison
+_MAX_SCORE_WORKERS = 4
+
+# From this many possible pairs on, the full score matrix is skipped and
+# candidates come from MinHash LSH. The matrix is float32, so 25M pairs
+# (e.g. 5000 x 5000 units) is about 100 MB; below that, exact scoring of
+# every pair is affordable and loses nothing to LSH misses.
+_LSH_MIN_PAIRS = 25_000_000
+# 3-gram Jaccard similarity that LSH candidates must reach. This is kept well
+# below the ratio threshold because Jaccard runs lower than the edit ratio on
+# the same pair: near-duplicates with a quarter of their words replaced still
+# come through, at the cost of more candidates for rapidfuzz to reject.
+_LSH_JACCARD_THRESHOLD = 0.2
+_LSH_NUM_PERM = 128
+# Weight false negatives (missed matches) over false positives when datasketch
+# picks the band layout
+_LSH_WEIGHTS = (0.1, 0.9)
+
 def preprocess_text(text):
     """
     Preprocess the text by removing special characters and converting to lowercase.
     """
-    # Convert to lowercase and remove special characters
-    text = re.sub(r'[^\w\s]', '', text.lower())
-    # Remove extra whitespaces
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    # Convert to lowercase and remove special characters, then collapse
+    # whitespace with split/join which avoids a second regex pass
+    return ' '.join(_PUNCT_RE.sub('', text.lower()).split())
+
+def count_words(text):
+    """Count whitespace-separated words without building a list of them."""
+    return sum(1 for _ in _WORD_RE.finditer(text))
 
 def get_interpretation(similarity_score):
     """Return interpretation text based on similarity score."""
@@ -140,18 +177,28 @@ def get_file_date(file_path):
     except:
         return "Unknown"
     
+@functools.lru_cache(maxsize=64)
+def _extract_text_cached(file_path, mtime_ns, size):
+    """
+    Run textract on a file. The modification time and size are part of the
+    cache key so a changed file is extracted again.
+    """
+    import textract
+    
+    # Extract text from various file formats, replacing undecodable bytes
+    text = textract.process(file_path).decode('utf-8', errors='replace')
+    # Clean up the text
+    text = text.translate(_TAB_TRANS)   # Replace tabs with spaces
+    return _NEWLINES_RE.sub('\n', text)  # Replace multiple newlines with single
+
 def extract_text_from_file(file_path):
     """
     Extract text from various file formats using textract.
     Returns the extracted text as a string.
     """
     try:
-        # Extract text from various file formats
-        text = textract.process(file_path).decode('utf-8')
-        # Clean up the text
-        text = re.sub(r'\n+', '\n', text)  # Replace multiple newlines with single
-        text = re.sub(r'\t', ' ', text)    # Replace tabs with spaces
-        return text
+        stat = os.stat(file_path)
+        return _extract_text_cached(file_path, stat.st_mtime_ns, stat.st_size)
     except Exception as e:
         print(f"Error extracting text: {e}")
         return ""
@@ -164,7 +211,7 @@ def get_report_filename(file1_path, file2_path):
     file2_name = os.path.basename(file2_path)
     
     # Create a hash of the filenames to ensure uniqueness
-    hash_str = hashlib.md5(f"{file1_name}_{file2_name}_{datetime.datetime.now()}".encode()).hexdigest()[:8]
+    hash_str = hashlib.blake2b(f"{file1_name}_{file2_name}_{datetime.datetime.now()}".encode(), digest_size=4).hexdigest()
     
     return f"similarity_report_{hash_str}.pdf"
 
@@ -201,133 +248,341 @@ def create_pie_chart(data_dict, width=400, height=200):
     return drawing
 
 def calculate_similarity_score(text1, text2):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    
     preprocessed_text1 = preprocess_text(text1)
     preprocessed_text2 = preprocess_text(text2)
 
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform([preprocessed_text1, preprocessed_text2])
-    similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
+    # Character n-grams within word boundaries tolerate extraction noise and
+    # small rewordings better than whole-word tokens
+    vectorizer = TfidfVectorizer(
+        analyzer='char_wb',
+        ngram_range=(4, 7),
+        sublinear_tf=True,
+        norm='l2',
+        max_features=250000,
+        min_df=1
+    )
+    try:
+        tfidf_matrix = vectorizer.fit_transform([preprocessed_text1, preprocessed_text2])
+    except ValueError:
+        # Empty vocabulary, nothing to compare
+        return 0.0
+
+    # Rows are l2-normalised, so their dot product is the cosine similarity
+    similarity = (tfidf_matrix @ tfidf_matrix.T)[0, 1]
+
+    return round(float(similarity) * 100, 2)
+
+@dataclass
+class SimilarSentences:
+    """
+    Matches found by find_similar_sentences, stored column-wise and ordered
+    by similarity (highest first). Row k of every field describes match k.
+    """
+    text1_idx: np.ndarray = field(default_factory=lambda: np.array([], dtype=int))  # -1 marks a chunk
+    text2_idx: np.ndarray = field(default_factory=lambda: np.array([], dtype=int))  # -1 marks a chunk
+    similarity: np.ndarray = field(default_factory=lambda: np.array([]))            # Percentage, 2 decimals
+    text1_sentences: list = field(default_factory=list)
+    text2_sentences: list = field(default_factory=list)
+    
+    def __len__(self):
+        return len(self.similarity)
+
+def _clean_text(text):
+    """Clean and normalize text to improve sentence tokenization."""
+    # Collapse all whitespace (newlines included) to single spaces, then
+    # remove special characters that might interfere with tokenization
+    return _SPECIAL_CHARS_RE.sub(' ', ' '.join(text.split())).strip()
+
+@functools.lru_cache(maxsize=None)
+def _get_sentence_tokenizer():
+    """
+    Load NLTK's English Punkt sentence tokenizer once per process,
+    downloading its data if needed. Returns None if the data is unavailable.
+    """
+    import nltk
+    from nltk.tokenize import PunktTokenizer
+    
+    # Download necessary NLTK data (run once)
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+    except LookupError:
+        nltk.download('punkt_tab')
+    try:
+        return PunktTokenizer('english')
+    except LookupError:
+        return None
+
+def _get_sentences(text):
+    """Split text into sentences, trying progressively simpler methods."""
+    tokenizer = _get_sentence_tokenizer()
+    try:
+        if tokenizer is None:
+            raise LookupError("Punkt tokenizer data is not available")
+        # First try NLTK sentence tokenization
+        return tokenizer.tokenize(text)
+    except Exception:
+        try:
+            # Fall back to regex-based sentence splitting
+            return _SENT_SPLIT_RE.split(text)
+        except Exception:
+            # Ultimate fallback - split by newlines and periods
+            sentences = []
+            for line in text.split('\n'):
+                if line.strip():
+                    # If line contains multiple sentences, split them
+                    if _SENT_END_RE.search(line):
+                        sentences.extend([s.strip() + "." for s in _SENT_SPLIT_RE.split(line) if s.strip()])
+                    else:
+                        sentences.append(line.strip())
+            return sentences
+
+def _create_smaller_chunks(sentences, chunk_size=30):
+    """Break long sentences into overlapping word windows for better matching."""
+    chunks = []
+    for sentence in sentences:
+        words = sentence.split()
+        if len(words) > chunk_size:
+            # Create overlapping chunks for longer sentences, using a strided
+            # view so the windows are not sliced out one by one in Python
+            windows = sliding_window_view(np.array(words, dtype=object), chunk_size)[::chunk_size // 2]
+            chunks.extend(' '.join(window) for window in windows)
+        else:
+            chunks.append(sentence)
+    return chunks
+
+def _merge_text_units(sentences, chunks):
+    """Append chunks to the sentence list, skipping texts that are already present."""
+    seen = set(sentences)
+    merged = list(sentences)
+    for chunk in chunks:
+        if chunk not in seen:
+            seen.add(chunk)
+            merged.append(chunk)
+    return merged
+
+def _score_candidate_rows(rows, text_units1, threshold):
+    """
+    Score candidate pairs with rapidfuzz's normalized similarity ratio.
+    
+    Args:
+        rows (list): (j, s2, candidate_indices) tuples, one per document 2 unit
+        text_units1 (list): Text units of document 1
+        threshold (float): Similarity threshold (0.0-1.0)
+        
+    Returns:
+        list: (i, j, similarity) tuples for pairs reaching the threshold
+    """
+    matches = []
+    score_cutoff = threshold * 100
+    
+    for j, s2, candidate_indices in rows:
+        l2 = len(s2)
+        for i in candidate_indices:
+            s1 = text_units1[i]
+            # The ratio is at most 2*min(l1, l2)/(l1+l2), so pairs whose lengths
+            # differ too much can be dropped before scoring at all
+            l1 = len(s1)
+            if 2 * min(l1, l2) < threshold * (l1 + l2):
+                continue
+            # Scores below the cutoff come back as 0 without a full computation
+            similarity = fuzz.ratio(s1, s2, score_cutoff=score_cutoff) / 100
+            
+            if similarity and similarity >= threshold:
+                matches.append((i, j, similarity))
+    
+    return matches
+
+# Document 1 text units, set once per scoring worker process by _init_score_worker
+_worker_text_units1 = None
+
+def _init_score_worker(text_units1):
+    """Keep document 1's text units in the worker so blocks don't carry them."""
+    global _worker_text_units1
+    _worker_text_units1 = text_units1
+
+def _score_worker_rows(rows, threshold):
+    """Score a block of rows in a worker against the units set by _init_score_worker."""
+    return _score_candidate_rows(rows, _worker_text_units1, threshold)
 
-    return round(similarity * 100, 2)
+def _lsh_candidates(text_units1, text_units2):
+    """
+    Find candidate pairs whose estimated character 3-gram Jaccard similarity
+    reaches _LSH_JACCARD_THRESHOLD, using MinHash LSH instead of comparing
+    every pair. This is meant for near-duplicate matches; loosely related
+    pairs scoring just over a low ratio threshold can be missed.
+    Returns a boolean CSR matrix with document 2 units on the rows.
+    """
+    from datasketch import MinHash, MinHashLSH
+    from scipy.sparse import csr_matrix
+    
+    def shingles(text):
+        text = text.lower()
+        return [text[k:k + 3].encode('utf8') for k in range(len(text) - 2)]
+    
+    minhashes1 = MinHash.bulk([shingles(s) for s in text_units1], num_perm=_LSH_NUM_PERM)
+    minhashes2 = MinHash.bulk([shingles(s) for s in text_units2], num_perm=_LSH_NUM_PERM)
+    
+    lsh = MinHashLSH(threshold=_LSH_JACCARD_THRESHOLD, num_perm=_LSH_NUM_PERM, weights=_LSH_WEIGHTS)
+    with lsh.insertion_session() as session:
+        for i, minhash in enumerate(minhashes1):
+            session.insert(i, minhash, check_duplication=False)
+    
+    rows, cols = [], []
+    for j, minhash in enumerate(minhashes2):
+        matched = lsh.query(minhash)
+        rows.extend([j] * len(matched))
+        cols.extend(matched)
+    
+    return csr_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, cols)),
+        shape=(len(text_units2), len(text_units1))
+    )
+
+def _score_all_pairs(text_units1, text_units2, threshold):
+    """
+    Score every pair of text units in one call.
+    rapidfuzz fills the score matrix in parallel native code and leaves pairs
+    below the cutoff at 0.
+    Returns (text1 indices, text2 indices, similarities) arrays.
+    """
+    scores = process.cdist(
+        text_units1, text_units2,
+        scorer=fuzz.ratio,
+        score_cutoff=threshold * 100,
+        dtype=np.float32,
+        workers=-1
+    )
+    match_idx1, match_idx2 = np.nonzero(scores)
+    return match_idx1, match_idx2, scores[match_idx1, match_idx2].astype(np.float64) / 100
+
+def _score_lsh_candidates(text_units1, text_units2, threshold):
+    """
+    Score only the pairs proposed by MinHash LSH.
+    Returns (text1 indices, text2 indices, similarities) arrays.
+    """
+    candidates = _lsh_candidates(text_units1, text_units2)
+    
+    rows = [
+        (j, text_units2[j], candidates.indices[candidates.indptr[j]:candidates.indptr[j + 1]].tolist())
+        for j in range(len(text_units2))
+        if candidates.indptr[j] != candidates.indptr[j + 1]
+    ]
+    
+    # Spread blocks of rows over worker processes when there are enough pairs to pay for them
+    if candidates.nnz >= _PARALLEL_MIN_CANDIDATES:
+        workers = min(os.cpu_count() or 1, _MAX_SCORE_WORKERS)
+        block_size = max(1, -(-len(rows) // (workers * 4)))
+        blocks = [rows[k:k + block_size] for k in range(0, len(rows), block_size)]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_score_worker,
+            initargs=(text_units1,)
+        ) as executor:
+            results = executor.map(_score_worker_rows, blocks, repeat(threshold))
+            matches = [match for block in results for match in block]
+    else:
+        matches = _score_candidate_rows(rows, text_units1, threshold)
+    
+    if not matches:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+    
+    match_idx1, match_idx2, match_scores = (np.array(column) for column in zip(*matches))
+    return match_idx1, match_idx2, match_scores
 
-def find_similar_sentences(text1, text2, threshold=0.3):
+def find_similar_sentences(text1, text2, threshold=0.4):
     """
     Find similar sentences between two texts using sequence matching.
+    Pairs are scored with rapidfuzz; for large documents candidate pairs are
+    first narrowed down with MinHash LSH.
     Handles text extraction issues by cleaning and normalizing the text.
     Uses a lower threshold to capture more matches for complete analysis.
     
     Args:
         text1 (str): Text from first document
         text2 (str): Text from second document
-        threshold (float): Similarity threshold (0.0-1.0), lower values find more matches
+        threshold (float): Similarity threshold (0.0-1.0), lower values find more matches.
+            This is rapidfuzz's Indel ratio, which runs higher than the difflib
+            ratio used before; 0.4 here admits about what 0.3 did there.
         
     Returns:
-        list: List of dictionaries containing similar sentence pairs
-    """
-    # Clean and normalize text to improve sentence tokenization
-    def clean_text(text):
-        # Replace multiple spaces with single space
-        text = re.sub(r'\s+', ' ', text)
-        # Replace multiple newlines with single newline
-        text = re.sub(r'\n+', '\n', text)
-        # Remove special characters that might interfere with tokenization
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\"\'\/\(\)\[\]\{\}\-\_\+\=\<\>\@\#\$\%\&\*]', ' ', text)
-        return text.strip()
-    
-    # Clean the texts
-    clean_text1 = clean_text(text1)
-    clean_text2 = clean_text(text2)
-    
-    # Try different methods to split into sentences
-    def get_sentences(text):
-        try:
-            # First try NLTK sentence tokenization
-            return sent_tokenize(text)
-        except Exception:
-            try:
-                # Fall back to regex-based sentence splitting
-                return re.split(r'(?<=[.!?])\s+', text)
-            except Exception:
-                # Ultimate fallback - split by newlines and periods
-                sentences = []
-                for line in text.split('\n'):
-                    if line.strip():
-                        # If line contains multiple sentences, split them
-                        if re.search(r'[.!?]', line):
-                            sentences.extend([s.strip() + "." for s in re.split(r'(?<=[.!?])\s+', line) if s.strip()])
-                        else:
-                            sentences.append(line.strip())
-                return sentences
+        SimilarSentences: Similar sentence pairs, highest similarity first
+    """
+    # Clean the texts to improve sentence tokenization
+    clean_text1 = _clean_text(text1)
+    clean_text2 = _clean_text(text2)
     
     # Get sentences using the robust method
-    sentences1 = get_sentences(clean_text1)
-    sentences2 = get_sentences(clean_text2)
-    
-    # Also try to break down into smaller chunks for better matching
-    def create_smaller_chunks(sentences, chunk_size=30):
-        chunks = []
-        for sentence in sentences:
-            words = sentence.split()
-            if len(words) > chunk_size:
-                # Create overlapping chunks for longer sentences
-                for i in range(0, len(words), chunk_size // 2):
-                    if i + chunk_size <= len(words):
-                        chunks.append(' '.join(words[i:i+chunk_size]))
-            else:
-                chunks.append(sentence)
-        return chunks
+    sentences1 = _get_sentences(clean_text1)
+    sentences2 = _get_sentences(clean_text2)
     
     # Create additional smaller chunks for better matching of partial similarities
-    additional_chunks1 = create_smaller_chunks(sentences1)
-    additional_chunks2 = create_smaller_chunks(sentences2)
+    additional_chunks1 = _create_smaller_chunks(sentences1)
+    additional_chunks2 = _create_smaller_chunks(sentences2)
     
     # Combine original sentences with smaller chunks
-    all_text_units1 = sentences1 + [chunk for chunk in additional_chunks1 if chunk not in sentences1]
-    all_text_units2 = sentences2 + [chunk for chunk in additional_chunks2 if chunk not in sentences2]
+    all_text_units1 = _merge_text_units(sentences1, additional_chunks1)
+    all_text_units2 = _merge_text_units(sentences2, additional_chunks2)
     
     # Remove very short or empty sentences
     all_text_units1 = [s for s in all_text_units1 if s and len(s.split()) >= 3]
     all_text_units2 = [s for s in all_text_units2 if s and len(s.split()) >= 3]
     
-    similar_sentences = []
+    if not all_text_units1 or not all_text_units2:
+        return SimilarSentences()
     
-    # Find similar sentence pairs
-    for i, s1 in enumerate(all_text_units1):
-        for j, s2 in enumerate(all_text_units2):
-            # Calculate similarity using SequenceMatcher
-            similarity = SequenceMatcher(None, s1, s2).ratio()
-            
-            if similarity >= threshold:
-                similar_sentences.append({
-                    "text1_idx": i if i < len(sentences1) else -1,  # Mark as chunk if needed
-                    "text1_sentence": s1,
-                    "text2_idx": j if j < len(sentences2) else -1,  # Mark as chunk if needed
-                    "text2_sentence": s2,
-                    "similarity": round(similarity * 100, 2)
-                })
-    
-    # Remove duplicates (keep highest similarity matches)
-    unique_matches = {}
-    for match in similar_sentences:
-        key = (match['text1_sentence'], match['text2_sentence'])
-        if key not in unique_matches or unique_matches[key]['similarity'] < match['similarity']:
-            unique_matches[key] = match
-    
-    # Sort by similarity score (highest first)
-    return sorted(unique_matches.values(), key=lambda x: x['similarity'], reverse=True)
+    # Score every pair directly with rapidfuzz; large comparisons are
+    # narrowed down with MinHash LSH first to avoid the all-pairs matrix
+    if len(all_text_units1) * len(all_text_units2) < _LSH_MIN_PAIRS:
+        match_idx1, match_idx2, match_scores = _score_all_pairs(all_text_units1, all_text_units2, threshold)
+    else:
+        match_idx1, match_idx2, match_scores = _score_lsh_candidates(all_text_units1, all_text_units2, threshold)
+    
+    if not match_scores.size:
+        return SimilarSentences()
+    
+    # The same text can occur at several positions; map every unit to the
+    # first position holding identical text so duplicates share a key
+    first_pos1, first_pos2 = {}, {}
+    parent1 = np.array([first_pos1.setdefault(s, k) for k, s in enumerate(all_text_units1)])
+    parent2 = np.array([first_pos2.setdefault(s, k) for k, s in enumerate(all_text_units2)])
+    
+    # Sort by similarity score (highest first), then remove duplicates keeping
+    # the first, i.e. highest similarity, occurrence of each text pair
+    order = np.argsort(-match_scores, kind='stable')
+    pair_keys = np.stack([parent1[match_idx1[order]], parent2[match_idx2[order]]])
+    _, first_seen = np.unique(pair_keys, axis=1, return_index=True)
+    order = order[np.sort(first_seen)]
+    
+    match_idx1 = match_idx1[order]
+    match_idx2 = match_idx2[order]
+    
+    return SimilarSentences(
+        # Mark as chunk if needed
+        text1_idx=np.where(match_idx1 < len(sentences1), match_idx1, -1),
+        text2_idx=np.where(match_idx2 < len(sentences2), match_idx2, -1),
+        similarity=np.round(match_scores[order] * 100, 2),
+        text1_sentences=[all_text_units1[i] for i in match_idx1.tolist()],
+        text2_sentences=[all_text_units2[j] for j in match_idx2.tolist()]
+    )
 
 def generate_similarity_report(file1_path, file2_path, output_path):
     """
     Generate a comprehensive similarity report in PDF format with user-friendly design.
     The report shows side-by-side comparisons of similar content in both documents.
+    Returns a tuple of (report path, similarity score).
     """
     # Extract text and calculate similarity
     text1 = extract_text_from_file(file1_path)
     text2 = extract_text_from_file(file2_path)
     similarity_score = calculate_similarity_score(text1, text2)
+    word_count1 = count_words(text1)
+    word_count2 = count_words(text2)
     
-    # Use a lower threshold to catch more potential matches
-    similar_sentences = find_similar_sentences(text1, text2, threshold=0.3)
+    # Use a lower threshold to catch more potential matches (rapidfuzz ratio,
+    # roughly difflib's 0.3)
+    similar_sentences = find_similar_sentences(text1, text2, threshold=0.4)
 
     # Create PDF document
     doc = SimpleDocTemplate(output_path, pagesize=A4)
@@ -381,9 +636,7 @@ def generate_similarity_report(file1_path, file2_path, output_path):
     pie.data = [similarity_score, 100-similarity_score]
     pie.labels = ["Similar", "Different"]
     pie.slices.strokeWidth = 0.5
-    pie.slices[0].fillColor = colors.red if similarity_score >= 75 else \
-                             colors.orange if similarity_score >= 50 else \
-                             colors.yellow if similarity_score >= 25 else colors.green
+    pie.slices[0].fillColor = _SIMILARITY_COLORS[_SIMILARITY_BUCKETS[int(similarity_score)]][2]
     pie.slices[1].fillColor = colors.lightgrey
     drawing.add(pie)
     
@@ -409,7 +662,7 @@ def generate_similarity_report(file1_path, file2_path, output_path):
     file_data = [
         ["", "Document 1", "Document 2"],
         ["Filename", os.path.basename(file1_path), os.path.basename(file2_path)],
-        ["Word Count", str(len(text1.split())), str(len(text2.split()))],
+        ["Word Count", str(word_count1), str(word_count2)],
         ["First Submission", get_file_date(file1_path), get_file_date(file2_path)]
     ]
     
@@ -432,10 +685,10 @@ def generate_similarity_report(file1_path, file2_path, output_path):
         elements.append(Spacer(1, 12))
         
         # Limit to top 15 matches to avoid excessively long reports
-        display_matches = similar_sentences[:15]
+        display_count = min(len(similar_sentences), 15)
         
         elements.append(Paragraph(
-            f"Showing top {len(display_matches)} matches out of {len(similar_sentences)} found. Matches are ordered by similarity percentage.", 
+            f"Showing top {display_count} matches out of {len(similar_sentences)} found. Matches are ordered by similarity percentage.", 
             styles["Italic"]
         ))
         elements.append(Spacer(1, 12))
@@ -447,7 +700,22 @@ def generate_similarity_report(file1_path, file2_path, output_path):
                 return text[:max_length] + "... [content truncated for display]"
             return text
         
-        for i, match in enumerate(display_matches):
+        # Build one chunk style per highlight colour up front and share it
+        # between every chunk of every match
+        chunk_styles = [
+            ParagraphStyle(
+                name=f"Chunk{bucket}",
+                parent=styles["Normal"],
+                backColor=bgcolor,
+                textColor=text_color,
+                wordWrap='CJK'  # Better word wrapping
+            )
+            for bucket, (text_color, bgcolor, _) in enumerate(_SIMILARITY_COLORS)
+        ]
+        
+        display_similarities = similar_sentences.similarity[:display_count].tolist()
+        
+        for i, similarity in enumerate(display_similarities):
             if i > 0:
                 elements.append(Spacer(1, 12))
                 elements.append(HorizontalLineFlowable(500))
@@ -456,30 +724,18 @@ def generate_similarity_report(file1_path, file2_path, output_path):
             # Create match header with similarity score
             elements.append(
                 Paragraph(
-                    f"<b>Match #{i+1}</b> - Similarity: {match['similarity']}%", 
+                    f"<b>Match #{i+1}</b> - Similarity: {similarity}%", 
                     styles["Heading4"]
                 )
             )
             elements.append(Spacer(1, 6))
             
             # Determine color for this match
-            similarity = match['similarity']
-            if similarity >= 75:
-                color_name = "darkred"
-                bgcolor = "#FFD6D6"  # Red
-            elif similarity >= 50:
-                color_name ="darkorange"
-                bgcolor = "#FFE8CC"  # Orange
-            elif similarity >= 25:
-                color_name = "darkgoldenrod"
-                bgcolor = "#FFF4CC"   # Yellow
-            else:
-                color_name = "darkgreen"
-                bgcolor = "#D6FFD6"  # Green
+            chunk_style = chunk_styles[_SIMILARITY_BUCKETS[int(similarity)]]
             
             # Safely truncate content to prevent overflow
-            truncated_text1 = safe_truncate(match['text1_sentence'])
-            truncated_text2 = safe_truncate(match['text2_sentence'])
+            truncated_text1 = safe_truncate(similar_sentences.text1_sentences[i])
+            truncated_text2 = safe_truncate(similar_sentences.text2_sentences[i])
             
             # Split long texts into smaller chunks for better PDF handling
             def split_text_into_chunks(text, max_chars=300):
@@ -490,7 +746,7 @@ def generate_similarity_report(file1_path, file2_path, output_path):
                 
                 chunks = []
                 # Try to split at sentence boundaries first
-                sentences = re.split(r'(?<=[.!?])\s+', text)
+                sentences = _SENT_SPLIT_RE.split(text)
                 current_chunk = ""
                 
                 for sentence in sentences:
@@ -540,22 +796,8 @@ def generate_similarity_report(file1_path, file2_path, output_path):
             # Add each pair of chunks as a row
             for t1_chunk, t2_chunk in zip(text1_chunks, text2_chunks):
                 # Create styled paragraphs for each chunk
-                p1 = Paragraph(t1_chunk, 
-                               ParagraphStyle(
-                                   name="Chunk1",
-                                   parent=styles["Normal"],
-                                   backColor=bgcolor,
-                                   textColor=getattr(colors, color_name),
-                                   wordWrap='CJK'  # Better word wrapping
-                               ))
-                p2 = Paragraph(t2_chunk, 
-                               ParagraphStyle(
-                                   name="Chunk2", 
-                                   parent=styles["Normal"],
-                                   backColor=bgcolor,
-                                   textColor=getattr(colors, color_name),
-                                   wordWrap='CJK'  # Better word wrapping
-                               ))
+                p1 = Paragraph(t1_chunk, chunk_style)
+                p2 = Paragraph(t2_chunk, chunk_style)
                 
                 match_data.append([p1, p2])
             
@@ -577,7 +819,7 @@ def generate_similarity_report(file1_path, file2_path, output_path):
             elements.append(Spacer(1, 6))
             elements.append(
                 Paragraph(
-                    f"<i>Similarity score: {match['similarity']}%</i>",
+                    f"<i>Similarity score: {similarity}%</i>",
                     ParagraphStyle(
                         name="Similarity",
                         parent=styles["Italic"],
@@ -587,7 +829,7 @@ def generate_similarity_report(file1_path, file2_path, output_path):
             )
             
             # Add a page break after each match if needed
-            if i < len(display_matches) - 1:
+            if i < display_count - 1:
                 elements.append(PageBreak())
     else:
         # Only show placeholders if no matches found
@@ -637,7 +879,7 @@ def generate_similarity_report(file1_path, file2_path, output_path):
         # Fallback to a simpler report if complex one fails
         generate_simple_report(file1_path, file2_path, output_path, similarity_score, similar_sentences)
     
-    return output_path
+    return output_path, similarity_score
 
 def generate_simple_report(file1_path, file2_path, output_path, similarity_score, similar_sentences):
     """
@@ -669,14 +911,14 @@ def generate_simple_report(file1_path, file2_path, output_path, similarity_score
     
     if similar_sentences:
         # Limit to top 10 matches
-        display_matches = similar_sentences[:10]
+        display_similarities = similar_sentences.similarity[:10].tolist()
         
-        for i, match in enumerate(display_matches):
-            elements.append(Paragraph(f"Match #{i+1} - Similarity: {match['similarity']}%", styles["Heading3"]))
+        for i, similarity in enumerate(display_similarities):
+            elements.append(Paragraph(f"Match #{i+1} - Similarity: {similarity}%", styles["Heading3"]))
             elements.append(Paragraph("Document 1:", styles["Heading4"]))
             
             # Safely truncate to prevent overflow
-            doc1_text = match['text1_sentence']
+            doc1_text = similar_sentences.text1_sentences[i]
             if len(doc1_text) > 500:
                 doc1_text = doc1_text[:500] + "... [truncated]"
             
@@ -685,7 +927,7 @@ def generate_simple_report(file1_path, file2_path, output_path, similarity_score
             
             elements.append(Paragraph("Document 2:", styles["Heading4"]))
             
-            doc2_text = match['text2_sentence']
+            doc2_text = similar_sentences.text2_sentences[i]
             if len(doc2_text) > 500:
                 doc2_text = doc2_text[:500] + "... [truncated]"
                 
@@ -715,24 +957,12 @@ def calculate_similarity(file1_path, file2_path):
     report_filename = get_report_filename(file1_path, file2_path)
     output_path = os.path.join(reports_dir, report_filename)
     
-    # Generate the report
+    # Generate the report, which also gives back the similarity score
     try:
-        report_path = generate_similarity_report(file1_path, file2_path, output_path)
-        
-        # Extract text from files for basic similarity score
-        text1 = extract_text_from_file(file1_path)
-        text2 = extract_text_from_file(file2_path)
-        
-        # Calculate similarity score
-        preprocessed_text1 = preprocess_text(text1)
-        preprocessed_text2 = preprocess_text(text2)
-        
-        vectorizer = TfidfVectorizer()
-        tfidf_matrix = vectorizer.fit_transform([preprocessed_text1, preprocessed_text2])
-        similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
+        report_path, similarity_score = generate_similarity_report(file1_path, file2_path, output_path)
         
         return {
-            'similarity_score': round(similarity * 100, 2),
+            'similarity_score': similarity_score,
             'report_path': report_path,
             'report_filename': report_filename
         }
@@ -7,7 +7,7 @@ from rest_framework import permissions #if want to access to data must want cede
 from . import models
 from .models import St_Assignment
 from django.core.exceptions import ValidationError
-from .utils import calculate_similarity, extract_text_from_file
+from .utils import calculate_similarity, extract_text_from_file, find_similar_sentences
 import json
 from django.http import HttpResponseBadRequest, JsonResponse,HttpResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -26,7 +26,6 @@ from django.views.decorators.http import require_GET
 import mimetypes,os
 import logging
 from django.conf import settings
-from .web_similarity import analyze_assignment_web_similarity
 import datetime
 from django.core.files.storage import FileSystemStorage
 from .models import StudentSubmission
@@ -749,8 +748,9 @@ def detailed_comparison(request):
         text1 = extract_text_from_file(file_path1)
         text2 = extract_text_from_file(file_path2)
         
-        # Find similar sentences between the texts
-        similar_sentences = find_similar_sentences(text1, text2, threshold=0.6)
+        # Find similar sentences between the texts (rapidfuzz ratio, roughly
+        # difflib's 0.6)
+        similar_sentences = find_similar_sentences(text1, text2, threshold=0.65)
         
         # Format the response data for frontend
         text1_segments = []
@@ -759,23 +759,24 @@ def detailed_comparison(request):
         # Create text segments with highlighted matches
         if similar_sentences:
             # Sort sentences by their position in the documents
-            doc1_sentences = sorted(similar_sentences, key=lambda x: x['text1_idx'])
-            doc2_sentences = sorted(similar_sentences, key=lambda x: x['text2_idx'])
+            doc1_order = similar_sentences.text1_idx.argsort(kind='stable').tolist()
+            doc2_order = similar_sentences.text2_idx.argsort(kind='stable').tolist()
+            percentages = similar_sentences.similarity.tolist()
             
             # Extract text segments for document 1
-            for match in doc1_sentences:
+            for k in doc1_order:
                 text1_segments.append({
-                    'text': match['text1_sentence'],
+                    'text': similar_sentences.text1_sentences[k],
                     'isMatch': True,
-                    'percentage': match['similarity']
+                    'percentage': percentages[k]
                 })
             
             # Extract text segments for document 2
-            for match in doc2_sentences:
+            for k in doc2_order:
                 text2_segments.append({
-                    'text': match['text2_sentence'],
+                    'text': similar_sentences.text2_sentences[k],
                     'isMatch': True,
-                    'percentage': match['similarity']
+                    'percentage': percentages[k]
                 })
         
         # If no similar sentences found but there's a similarity score
@@ -855,6 +856,10 @@ def check_web_similarity(request):
         
         logger.info(f"Starting web similarity analysis for submission {submission_id} for assignment {assignment.id}")
         
+        # Imported here so textract, sklearn and the Gemini/LangChain clients are
+        # only loaded by workers that actually run a web similarity check
+        from .web_similarity import analyze_assignment_web_similarity
+        
         # Analyze web similarity using CrewAI
         result = analyze_assignment_web_similarity(submission_path, web_reports_dir)
         
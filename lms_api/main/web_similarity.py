@@ -38,6 +38,10 @@ try:
 except Exception as e:
     logger.error(f"Error configuring Gemini AI: {e}")
 
+# Pre-compiled patterns for cleaning extracted text
+_NEWLINES_RE = re.compile(r'\n+')
+_TAB_TRANS = str.maketrans('\t', ' ')
+
 # Helper classes and functions
 class HorizontalLineFlowable(Flowable):
     """A flowable that draws a horizontal line."""
@@ -56,11 +60,10 @@ class HorizontalLineFlowable(Flowable):
 def extract_text_from_file(file_path):
     """Extract text from various file formats."""
     try:
-        text = textract.process(file_path).decode('utf-8')
+        text = textract.process(file_path).decode('utf-8', errors='replace')
         # Clean up the text
-        text = re.sub(r'\n+', '\n', text)  # Replace multiple newlines with single
-        text = re.sub(r'\t', ' ', text)    # Replace tabs with spaces
-        return text
+        text = text.translate(_TAB_TRANS)   # Replace tabs with spaces
+        return _NEWLINES_RE.sub('\n', text)  # Replace multiple newlines with single
     except Exception as e:
         logger.error(f"Error extracting text from {file_path}: {e}")
         return ""
@@ -617,7 +620,7 @@ def get_web_similarity_report_filename(assignment_path):
     """Generate a unique filename for the web similarity report."""
     base_name = os.path.basename(assignment_path)
     timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    hash_str = hashlib.md5(f"{base_name}_{timestamp}".encode()).hexdigest()[:8]
+    hash_str = hashlib.blake2b(f"{base_name}_{timestamp}".encode(), digest_size=4).hexdigest()
     
     return f"web_similarity_report_{hash_str}.pdf"
 